@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+app.py
+API FastAPI de atualização de precatórios (TJSP):
+- corrige o principal por períodos ANTES / GRAÇA / PÓS usando indices.csv;
+- juros simples a.a. embutidos como taxa mensal extra nos períodos ANTES e PÓS;
+- IR retido na fonte por tabela de faixas (opcional, incide sobre os juros PÓS).
+
+Rodar:
+  uvicorn app:app --host 0.0.0.0 --port 8000
+"""
+
+from __future__ import annotations
+import bisect
+import math
+from datetime import date
+from decimal import Decimal, ROUND_HALF_EVEN
+from functools import lru_cache
+from typing import Annotated, List, Optional
+
+import numpy as np
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, PlainSerializer
+
+from indices_provider import IndicesProvider, split_periodos
+
+# ---------------------- CONFIG ----------------------
+TWOPLACES = Decimal("0.01")
+
+provider = IndicesProvider("indices.csv")
+
+# orjson serializa a resposta em C (formatação SIMD de números)
+app = FastAPI(title="calc-precatorio-tjsp", default_response_class=ORJSONResponse)
+
+# ---------------------- MODELOS ---------------------
+# Decimal -> str direto no serializador Rust do pydantic-core, sem callback
+# Python por campo (o caminho lento do antigo json_encoders)
+DecimalStr = Annotated[Decimal, PlainSerializer(str, return_type=str, when_used="json")]
+
+class FaixaIR(BaseModel):
+    ate: DecimalStr           # teto da faixa (base de cálculo)
+    aliquota: DecimalStr      # fração (ex.: 0.275 = 27,5%)
+    parcela_deduzir: DecimalStr
+
+
+class FatoresIndice(BaseModel):
+    antes: List[float]        # frações mensais usadas no período ANTES
+    graca: List[float]
+    pos: List[float]
+
+
+class CalcInput(BaseModel):
+    precatorio: str
+    principal: DecimalStr
+    inicio_antes: date
+    fim_antes: date           # exclusivo
+    inicio_graca: Optional[date] = None
+    fim_graca: Optional[date] = None
+    inicio_pos: date
+    fim_pos: date             # exclusivo
+    indice: str = "IPCA-E"
+    juros_aa_antes: DecimalStr = Decimal("0.06")
+    juros_aa_pos: DecimalStr = Decimal("0.02")
+    tabela_ir: Optional[List[FaixaIR]] = None
+
+
+class CalcOutput(BaseModel):
+    precatorio: str
+    fator_antes: float
+    fator_graca: float
+    fator_pos: float
+    fator_ipca_pos_apenas: float
+    principal_apos_antes: DecimalStr
+    principal_apos_graca: DecimalStr
+    principal_atualizado: DecimalStr
+    juros_pos: DecimalStr
+    ir_retido: DecimalStr
+    total_bruto: DecimalStr
+    total_liquido: DecimalStr
+    meses_antes: int
+    meses_graca: int
+    meses_pos: int
+
+
+# ---------------------- HELPERS ---------------------
+def quantize_cents(x: float) -> Decimal:
+    # única fronteira float -> Decimal do pipeline: o formatador de float já
+    # arredonda half-even, então o Decimal nasce quantizado em centavos
+    return Decimal(f"{x:.2f}")
+
+@lru_cache(maxsize=256)
+def annual_to_monthly_rate(annual_rate_str: str) -> float:
+    # equivalência composta: (1+a)^(1/12) - 1, via log1p/expm1 (estável); em
+    # produção há meia dúzia de taxas distintas, então o cache vira um lookup
+    return math.expm1(math.log1p(float(annual_rate_str)) / 12)
+
+def compose_factors(series, extra_monthly_rate: float = 0.0) -> float:
+    """
+    Compõe fatores mensais: prod(1 + variacao_m + taxa_extra_m), em float64.
+    Com ~0-100 fatores em [0.99, 1.02], o erro acumulado (~len*eps) fica ordens
+    de grandeza abaixo do centavo; Decimal só entra na quantização final.
+    """
+    if len(series) == 0:
+        return 1.0
+    extra = float(extra_monthly_rate)
+    if len(series) < 64:
+        # séries curtas (caso típico: <= 24 meses): math.prod puro evita até a
+        # alocação de um ndarray intermediário
+        return math.prod(1.0 + float(m) + extra for m in series)
+    arr = np.asarray(series, dtype=np.float64)
+    return float(np.prod(arr + (1.0 + extra)))
+
+# tabela ordenada + lista de tetos, cacheadas por conteúdo da tabela
+_faixa_cache: dict = {}
+
+def calcular_ir(base_juros: Decimal, tabela_ir: Optional[List[FaixaIR]]) -> Decimal:
+    """IR por faixa: acha a primeira faixa com base <= ate; última se estourar."""
+    if not tabela_ir or base_juros <= 0:
+        return Decimal("0")
+    key = tuple((f.ate, f.aliquota, f.parcela_deduzir) for f in tabela_ir)
+    cached = _faixa_cache.get(key)
+    if cached is None:
+        faixas = sorted(tabela_ir, key=lambda f: f.ate)
+        cached = _faixa_cache[key] = ([f.ate for f in faixas], faixas)
+    tetos, faixas = cached
+    # busca binária no lugar do scan linear com comparações Decimal
+    i = bisect.bisect_left(tetos, base_juros)
+    escolhida = faixas[i] if i < len(faixas) else faixas[-1]
+    ir = base_juros * escolhida.aliquota - escolhida.parcela_deduzir
+    return ir if ir > 0 else Decimal("0")
+
+# ---------------------- CÁLCULO ---------------------
+def _montar_saida(payload: CalcInput, n_antes: int, n_graca: int, n_pos: int,
+                  fator_antes: float, fator_graca: float,
+                  fator_pos: float, fator_ipca_pos_apenas: float) -> CalcOutput:
+    # a cadeia inteira roda em float64 (15-17 dígitos significativos — sobra
+    # para quantização em centavos); Decimal só aparece nos valores reportados
+    apos_antes = float(payload.principal) * fator_antes
+    apos_graca = apos_antes * fator_graca
+    atualizado = apos_graca * fator_ipca_pos_apenas
+
+    # juros do PÓS = diferença entre o fator com e sem a taxa extra
+    juros_pos = quantize_cents(apos_graca * (fator_pos - fator_ipca_pos_apenas))
+
+    ir_retido = calcular_ir(juros_pos, payload.tabela_ir).quantize(TWOPLACES, ROUND_HALF_EVEN)
+    principal_apos_antes = quantize_cents(apos_antes)
+    principal_apos_graca = quantize_cents(apos_graca)
+    principal_atualizado = quantize_cents(atualizado)
+    total_bruto = quantize_cents(atualizado + float(juros_pos))
+    total_liquido = total_bruto - ir_retido  # diferença de valores já em centavos
+
+    # model_construct pula a validação do Pydantic — todos os campos acima já
+    # saem tipados daqui (Decimal/int), então validar de novo é só custo de CPU
+    return CalcOutput.model_construct(
+        precatorio=payload.precatorio,
+        fator_antes=fator_antes,
+        fator_graca=fator_graca,
+        fator_pos=fator_pos,
+        fator_ipca_pos_apenas=fator_ipca_pos_apenas,
+        principal_apos_antes=principal_apos_antes,
+        principal_apos_graca=principal_apos_graca,
+        principal_atualizado=principal_atualizado,
+        juros_pos=juros_pos,
+        ir_retido=ir_retido,
+        total_bruto=total_bruto,
+        total_liquido=total_liquido,
+        meses_antes=n_antes,
+        meses_graca=n_graca,
+        meses_pos=n_pos,
+    )
+
+def _split_ou_422(payload: CalcInput):
+    try:
+        return split_periodos(
+            provider, payload.indice,
+            payload.inicio_antes, payload.fim_antes,
+            payload.inicio_graca, payload.fim_graca,
+            payload.inicio_pos, payload.fim_pos,
+        )
+    except (KeyError, FileNotFoundError) as e:
+        raise HTTPException(status_code=422, detail=f"{payload.precatorio}: {e}")
+
+def _calc_all_factors(antes, graca, pos,
+                      r_antes_m: float, r_pos_m: float) -> tuple:
+    """
+    Calcula os 4 fatores de calcular() em uma passada por lista (fusão de
+    loops): cada série vira um array float64 uma única vez, e o PÓS reaproveita
+    o mesmo array para o fator com e sem juros.
+    """
+    fator_antes = fator_graca = fator_pos = fator_ipca_pos_apenas = 1.0
+    if len(antes):
+        arr = np.asarray(antes, dtype=np.float64)
+        fator_antes = float(np.prod(arr + (1.0 + r_antes_m)))
+    if len(graca):
+        arr = np.asarray(graca, dtype=np.float64)
+        fator_graca = float(np.prod(arr + 1.0))
+    if len(pos):
+        arr = np.asarray(pos, dtype=np.float64)
+        fator_pos = float(np.prod(arr + (1.0 + r_pos_m)))
+        fator_ipca_pos_apenas = float(np.prod(arr + 1.0))
+    return fator_antes, fator_graca, fator_pos, fator_ipca_pos_apenas
+
+def calcular(payload: CalcInput) -> CalcOutput:
+    antes, graca, pos = _split_ou_422(payload)
+
+    r_antes_m = annual_to_monthly_rate(str(payload.juros_aa_antes))
+    r_pos_m = annual_to_monthly_rate(str(payload.juros_aa_pos))
+
+    # fatores por período (juros embutidos como taxa mensal extra)
+    fator_antes, fator_graca, fator_pos, fator_ipca_pos_apenas = \
+        _calc_all_factors(antes, graca, pos, r_antes_m, r_pos_m)
+
+    return _montar_saida(payload, len(antes), len(graca), len(pos),
+                         fator_antes, fator_graca, fator_pos, fator_ipca_pos_apenas)
+
+def _produtos_em_lote(series_list: List[list], extras: np.ndarray) -> np.ndarray:
+    """
+    prod(1 + variacao_m + extra_i) por linha, para o lote inteiro de uma vez:
+    as séries viram uma matriz (N, max_meses) com padding mascarado em 1.0,
+    reduzida com um único np.prod(axis=1).
+    """
+    n = len(series_list)
+    mx = max((len(s) for s in series_list), default=0)
+    if mx == 0:
+        return np.ones(n)
+    mat = np.zeros((n, mx), dtype=np.float64)
+    lens = np.empty(n, dtype=np.intp)
+    for i, s in enumerate(series_list):
+        lens[i] = len(s)
+        if len(s):
+            mat[i, :len(s)] = s
+    mask = np.arange(mx)[None, :] < lens[:, None]
+    fat = np.where(mask, mat + (1.0 + extras[:, None]), 1.0)
+    return fat.prod(axis=1)
+
+def calcular_lote(payloads: List[CalcInput]) -> List[CalcOutput]:
+    series = [_split_ou_422(p) for p in payloads]
+
+    r_antes = np.array([annual_to_monthly_rate(str(p.juros_aa_antes)) for p in payloads])
+    r_pos = np.array([annual_to_monthly_rate(str(p.juros_aa_pos)) for p in payloads])
+    zeros = np.zeros(len(payloads))
+
+    f_antes = _produtos_em_lote([s[0] for s in series], r_antes)
+    f_graca = _produtos_em_lote([s[1] for s in series], zeros)
+    f_pos = _produtos_em_lote([s[2] for s in series], r_pos)
+    f_pos_ipca = _produtos_em_lote([s[2] for s in series], zeros)
+
+    return [
+        _montar_saida(p, len(antes), len(graca), len(pos),
+                      float(fa) if len(antes) else 1.0,
+                      float(fg) if len(graca) else 1.0,
+                      float(fp) if len(pos) else 1.0,
+                      float(fpi) if len(pos) else 1.0)
+        for p, (antes, graca, pos), fa, fg, fp, fpi
+        in zip(payloads, series, f_antes, f_graca, f_pos, f_pos_ipca)
+    ]
+
+# esquema construído no import (e não na primeira requisição)
+CalcOutput.model_rebuild()
+
+# ---------------------- ROTAS -----------------------
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+@app.post("/calcular", response_model=None)
+def post_calcular(payload: CalcInput):
+    # dict em modo "json" (Decimal -> str) vai direto para o orjson,
+    # sem o re-encode do response_model
+    return calcular(payload).model_dump(mode="json")
+
+@app.post("/calcular_lote", response_model=None)
+def post_calcular_lote(payloads: List[CalcInput]):
+    # avaliação de carteira: amortiza validação/serialização sobre o lote e
+    # calcula os fatores de todos os itens em aritmética vetorizada
+    return [out.model_dump(mode="json") for out in calcular_lote(payloads)]
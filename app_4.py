@@ -23,12 +23,17 @@ B) ipcae_mensal.csv  -> data,fator  (YYYY-MM, 1.0043 ou '0,43%')
 """
 
 from __future__ import annotations
-import argparse, csv
-from dataclasses import dataclass
+import argparse, os
+from dataclasses import dataclass, field
+from functools import lru_cache
 from datetime import date
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Dict, Iterable, List, Tuple
 
+import numpy as np
+import pandas as pd
+from numba import njit
+
 # ----------------------------- datas ------------------------------------------
 
 def add_months(d: date, n: int) -> date:
@@ -37,12 +42,11 @@ def add_months(d: date, n: int) -> date:
     return date(y, m, 1)
 
 def month_range(start: date, end_exclusive: date) -> List[Tuple[int,int]]:
-    cur = start
-    out: List[Tuple[int,int]] = []
-    while cur < end_exclusive:
-        out.append((cur.year, cur.month))
-        cur = add_months(cur, 1)
-    return out
+    # aritmética direta no índice de mês (ano*12 + mes-1): zero objetos date
+    # intermediários, um por mês era puro overhead de alocação
+    s = start.year * 12 + start.month - 1
+    e = end_exclusive.year * 12 + end_exclusive.month - 1
+    return [(i // 12, i % 12 + 1) for i in range(s, e)]
 
 def first_day_next_month(d: date) -> date:
     return add_months(date(d.year, d.month, 1), 1)
@@ -58,54 +62,103 @@ def br_money(x: Decimal) -> str:
 
 # ----------------------------- índices ----------------------------------------
 
+# assinatura explícita: compila no import (com cache em disco), em vez de
+# pagar o JIT na primeira chamada do cálculo
+@njit("float64(float64[:], int32[:])", cache=True, fastmath=True)
+def _prod(dense: np.ndarray, idx: np.ndarray) -> float:
+    # produto dos fatores mensais em loop nativo (sem dict nem Decimal)
+    p = 1.0
+    for i in idx:
+        p *= dense[i]
+    return p
+
 @dataclass
 class Indices:
     fator_mensal: Dict[Tuple[int,int], Decimal]  # (ano,mes)->multiplicador
+    _dense: np.ndarray = field(init=False, repr=False)      # fator por (ano*12+mes)
+    _presente: np.ndarray = field(init=False, repr=False)   # bitmap de meses carregados
+
+    def __post_init__(self):
+        top = max(y * 12 + m for y, m in self.fator_mensal) + 1
+        self._dense = np.ones(top, dtype=np.float64)
+        self._presente = np.zeros(top, dtype=np.bool_)
+        for (y, m), f in self.fator_mensal.items():
+            i = y * 12 + m
+            self._dense[i] = float(f)
+            self._presente[i] = True
 
     @staticmethod
     def from_csv(path: str) -> "Indices":
-        fator_mensal: Dict[Tuple[int,int], Decimal] = {}
-        with open(path, "r", newline="", encoding="utf-8") as f:
-            rd = csv.DictReader(f)
-            cols = [c.strip().lower() for c in (rd.fieldnames or [])]
-            if set(["indice","ano","mes","variacao_mensal"]).issubset(cols):
-                # Formato A (seu)
-                for row in rd:
-                    ano = int(row["ano"]); mes = int(row["mes"])
-                    taxa = Decimal(str(row["variacao_mensal"]).strip().replace(",", "."))
-                    fator_mensal[(ano, mes)] = Decimal("1") + taxa
-            elif set(["data","fator"]).issubset(cols):
-                # Formato B (alternativo)
-                for row in rd:
-                    y, m = str(row["data"]).strip().split("-")
-                    raw = str(row["fator"]).strip().replace(",", ".")
-                    if raw.endswith("%"):
-                        fator = Decimal("1") + (Decimal(raw[:-1]) / Decimal("100"))
-                    else:
-                        val = Decimal(raw)
-                        fator = val if val > Decimal("0.5") else (Decimal("1") + val)
-                    fator_mensal[(int(y), int(m))] = fator
-            else:
-                raise ValueError("CSV não reconhecido. Use: "
-                                 "A) indice,ano,mes,variacao_mensal  ou  "
-                                 "B) data(YYYY-MM),fator")
+        # memoizado por (caminho, mtime): re-instanciar é O(1) enquanto o CSV
+        # não muda — importa quando o módulo roda embutido num serviço
+        return _from_csv_cached(path, os.stat(path).st_mtime_ns)
+
+    @staticmethod
+    def _from_csv_impl(path: str) -> "Indices":
+        # parser C do pandas + operações vetorizadas de string, em vez de
+        # DictReader + Decimal linha a linha
+        df = pd.read_csv(path)
+        df.columns = [str(c).strip().lower() for c in df.columns]
+        cols = set(df.columns)
+
+        if {"indice","ano","mes","variacao_mensal"}.issubset(cols):
+            # Formato A (seu)
+            anos = df["ano"].astype(int).to_numpy()
+            meses = df["mes"].astype(int).to_numpy()
+            taxas = (df["variacao_mensal"].astype(str)
+                     .str.strip().str.replace(",", ".", regex=False)
+                     .astype(np.float64).to_numpy())
+            fatores = 1.0 + taxas
+        elif {"data","fator"}.issubset(cols):
+            # Formato B (alternativo)
+            data = df["data"].astype(str).str.strip()
+            anos = data.str.slice(0, 4).astype(int).to_numpy()
+            meses = data.str.slice(5, 7).astype(int).to_numpy()
+            raw = df["fator"].astype(str).str.strip().str.replace(",", ".", regex=False)
+            pct = raw.str.endswith("%")
+            vals = raw.str.rstrip("%").astype(np.float64).to_numpy()
+            fatores = np.where(pct.to_numpy(), 1.0 + vals / 100.0,
+                               np.where(vals > 0.5, vals, 1.0 + vals))
+        else:
+            raise ValueError("CSV não reconhecido. Use: "
+                             "A) indice,ano,mes,variacao_mensal  ou  "
+                             "B) data(YYYY-MM),fator")
+
+        fator_mensal = {(int(a), int(m)): Decimal(repr(float(f)))
+                        for a, m, f in zip(anos, meses, fatores)}
         if not fator_mensal:
             raise ValueError("Nenhum índice carregado.")
         return Indices(fator_mensal)
 
     def product(self, ym_list: Iterable[Tuple[int,int]], debug: bool=False, label: str="") -> Decimal:
-        prod = Decimal("1")
+        if debug:
+            # fallback: loop Decimal original, que imprime fator mês a mês
+            prod = Decimal("1")
+            for y, m in ym_list:
+                if (y, m) not in self.fator_mensal:
+                    raise KeyError(f"Faltou IPCA-E para {y:04d}-{m:02d}")
+                f = self.fator_mensal[(y, m)]
+                print(f"  {label}  {y:04d}-{m:02d}  fator={f}")
+                prod *= f
+            return prod
+
+        ym_list = list(ym_list)
+        if not ym_list:
+            return Decimal("1")
         for y, m in ym_list:
-            if (y, m) not in self.fator_mensal:
+            i = y * 12 + m
+            if i >= self._presente.size or not self._presente[i]:
                 raise KeyError(f"Faltou IPCA-E para {y:04d}-{m:02d}")
-            f = self.fator_mensal[(y, m)]
-            if debug: print(f"  {label}  {y:04d}-{m:02d}  fator={f}")
-            prod *= f
-        return prod
+        idx = np.array([y * 12 + m for y, m in ym_list], dtype=np.int32)
+        return d(repr(_prod(self._dense, idx)))
 
     def last_available_month(self) -> Tuple[int,int]:
         return max(self.fator_mensal.keys())
 
+@lru_cache(maxsize=8)
+def _from_csv_cached(path: str, mtime_ns: int) -> Indices:
+    return Indices._from_csv_impl(path)
+
 # ----------------------------- períodos ---------------------------------------
 
 def periodos_antes_formacao(ano_venc: int):
@@ -222,6 +275,75 @@ def calcular(principal: Decimal, ano_venc: int, indices: Indices,
         meses_pos=n_pos,
     )
 
+# ----------------------------- uso embutido -----------------------------------
+
+def compute(principal: Decimal, ano_venc: int, juros_mora_ant: Decimal,
+            indices_csv: str = "indices_ipcae.csv",
+            pos_fim: Tuple[int,int] | None = None,
+            juros_aa_pos: Decimal = Decimal("0.02"),
+            antes_mode: str = "formacao",
+            override_antes: Decimal | None = None,
+            override_pos_ipca: Decimal | None = None) -> dict:
+    """
+    Versão importável do cálculo (sem prints, sem CLI): mesma aritmética de
+    calcular(), devolvendo direto as 12 chaves que o main.py extraía da saída
+    de texto. Valores monetários saem como Decimal quantizado em centavos
+    (o driver do banco binda numeric sem passar por float); fatores, como
+    float. O CSV de índices fica memoizado por (caminho, mtime) em
+    Indices.from_csv, então só a primeira chamada paga o parse.
+    """
+    indices = Indices.from_csv(indices_csv)
+    if pos_fim is None:
+        pos_fim = indices.last_available_month()
+
+    if antes_mode == "full":
+        inicio_antes, fim_antes_excl = periodos_antes_full(ano_venc)
+    else:
+        inicio_antes, fim_antes_excl = periodos_antes_formacao(ano_venc)
+    meses_antes = month_range(inicio_antes, fim_antes_excl)
+
+    inicio_pos, fim_pos_excl = periodo_pos(pos_fim, indices)
+    meses_pos = month_range(inicio_pos, fim_pos_excl)
+
+    if override_antes is not None:
+        fator_antes = d(override_antes)
+    else:
+        fator_antes = indices.product(meses_antes) if meses_antes else Decimal("1")
+
+    if override_pos_ipca is not None:
+        fator_ipca_pos = d(override_pos_ipca)
+    else:
+        fator_ipca_pos = indices.product(meses_pos) if meses_pos else Decimal("1")
+
+    n_meses_para_2aa = max(len(meses_pos) - 1, 0)
+    fator_juros_simples_pos = Decimal("1") + (d(juros_aa_pos) * Decimal(n_meses_para_2aa) / Decimal("12"))
+
+    principal = d(principal)
+    principal_apos_antes = q2(principal * fator_antes)
+    principal_pos_ipca   = q2(principal_apos_antes * fator_ipca_pos)
+    principal_final      = q2(principal_pos_ipca * fator_juros_simples_pos)
+
+    jm_ant_base = d(juros_mora_ant)
+    jm_ant_apos_antes = q2(jm_ant_base * fator_antes)
+    jm_ant_corrigido  = q2(jm_ant_apos_antes * fator_ipca_pos * fator_juros_simples_pos)
+
+    total_corrigido = q2(principal_final + jm_ant_corrigido)
+
+    return {
+        "fator_ipcae_antes": float(fator_antes),
+        "fator_ipcae_pos": float(fator_ipca_pos),
+        "fator_juros_2aa_simples": float(fator_juros_simples_pos),
+        "meses_para_2aa": n_meses_para_2aa,
+        "principal_original": q2(principal),
+        "principal_apos_antes": principal_apos_antes,
+        "principal_pos_ipca": principal_pos_ipca,
+        "principal_final_ipca_2aa": principal_final,
+        "juros_mora_anteriores_base": q2(jm_ant_base),
+        "juros_mora_apos_antes": jm_ant_apos_antes,
+        "juros_mora_final_corrigido": jm_ant_corrigido,
+        "total_corrigido": total_corrigido,
+    }
+
 # ----------------------------- CLI -------------------------------------------
 
 def parse_args() -> argparse.Namespace:
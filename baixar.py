@@ -12,14 +12,13 @@ Uso:
 """
 
 import argparse
-import os
-import re
 import sys
 import zipfile
 from pathlib import Path
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 PAGE_URL = ("https://www.ibge.gov.br/estatisticas/economicas/precos-e-custos/"
             "9262-indice-nacional-de-precos-ao-consumidor-amplo-especial.html?=&t=downloads")
@@ -46,9 +45,9 @@ def find_zip_mention_in_page(session: requests.Session) -> bool:
         print(f"⚠️  Não consegui abrir a página do IBGE ({PAGE_URL}). Erro: {e}")
         return False
 
-    soup = BeautifulSoup(r.text, "html.parser")
-    text = soup.get_text(" ", strip=True)
-    return TARGET_FILENAME in text
+    # busca de substring direto nos bytes — montar a árvore do BeautifulSoup
+    # só para isso custava o parse do HTML inteiro
+    return TARGET_FILENAME.encode("ascii") in r.content
 
 
 def stream_download(session: requests.Session, url: str, dest_path: Path) -> None:
@@ -57,16 +56,17 @@ def stream_download(session: requests.Session, url: str, dest_path: Path) -> Non
         r.raise_for_status()
         total = int(r.headers.get("Content-Length", "0"))
         downloaded = 0
-        chunk_size = 1024 * 64
+        last_report = 0
+        chunk_size = 1 << 20  # 1 MB: menos syscalls/idas ao kernel por chunk
 
         dest_path.parent.mkdir(parents=True, exist_ok=True)
         with open(dest_path, "wb") as f:
-            for chunk in r.iter_content(chunk_size=chunk_size):
-                if not chunk:
-                    continue
+            for chunk in r.iter_content(chunk_size=chunk_size, decode_unicode=False):
                 f.write(chunk)
                 downloaded += len(chunk)
-                if total:
+                # progresso a cada ~4 MB (o write no TTY custa mais que o chunk)
+                if total and downloaded - last_report >= (1 << 22):
+                    last_report = downloaded
                     pct = downloaded * 100 // total
                     sys.stdout.write(f"\r⬇️  Baixando {TARGET_FILENAME}... {pct}%")
                     sys.stdout.flush()
@@ -101,6 +101,12 @@ def main():
     out_path = out_dir / TARGET_FILENAME
 
     with requests.Session() as s:
+        # keep-alive + retry com backoff: a página e o ZIP saem do mesmo pool,
+        # economizando um handshake TLS entre as duas requisições
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=2,
+                              max_retries=Retry(total=3, backoff_factor=0.5))
+        s.mount("https://", adapter)
+
         print("🌐 Acessando página de downloads do IBGE…")
         found = find_zip_mention_in_page(s)
         if found:
@@ -1,3 +1,4 @@
+import shutil
 import zipfile
 from pathlib import Path
 
@@ -5,11 +6,27 @@ def extrair_zip_mesma_pasta(zip_path: Path):
     """Extrai o arquivo ZIP na mesma pasta onde está."""
     destino = zip_path.parent / zip_path.stem  # cria subpasta com o nome do arquivo (sem .zip)
     destino.mkdir(exist_ok=True)
+    nomes = []
     with zipfile.ZipFile(zip_path, "r") as zf:
-        zf.extractall(destino)
+        raiz = destino.resolve()
+        for info in zf.infolist():
+            alvo = destino / info.filename
+            # anti zip-slip (proteção que o extractall dava de graça): membro
+            # com caminho absoluto ou '..' não pode escrever fora do destino
+            if not alvo.resolve().is_relative_to(raiz):
+                raise ValueError(f"Membro suspeito no ZIP (escapa do destino): {info.filename!r}")
+            if info.is_dir():
+                alvo.mkdir(parents=True, exist_ok=True)
+                continue
+            alvo.parent.mkdir(parents=True, exist_ok=True)
+            # buffer de 1 MB por membro (extractall usa 16 KB) — extrai na
+            # banda do disco em vez de pagar Python por bloquinho
+            with zf.open(info) as src, open(alvo, "wb") as dst:
+                shutil.copyfileobj(src, dst, length=1 << 20)
+            nomes.append(info.filename)
     print(f"📂 Arquivos extraídos para: {destino.resolve()}")
     print("📦 Conteúdo extraído:")
-    for nome in zf.namelist():
+    for nome in nomes:
         print(f"   - {nome}")
 
 # Exemplo de uso
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gera o array denso de variações mensais (.npy) usado pelo IndicesProvider.
+
+A posição i do array corresponde ao mês ano*12 + mes-1; meses sem dado ficam
+como NaN. O serviço (app.py) abre esse arquivo com np.load(..., mmap_mode="r"),
+então os workers do uvicorn compartilham as páginas via page cache do kernel
+em vez de cada um parsear o CSV e montar o dicionário de Decimals.
+
+Uso:
+  python gerar_indices_npy.py --csv indices.csv --indice IPCA-E
+"""
+
+import argparse
+
+import numpy as np
+
+from indices_provider import IndicesProvider, npy_sidecar_path
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Gera o sidecar .npy denso de um índice")
+    ap.add_argument("--csv", default="indices.csv", help="CSV de índices (default: indices.csv)")
+    ap.add_argument("--indice", default="IPCA-E", help="Nome do índice (default: IPCA-E)")
+    args = ap.parse_args()
+
+    prov = IndicesProvider(args.csv)
+    prov._load()
+    chaves = [(ano, mes) for (ind, ano, mes) in prov._cache if ind == args.indice]
+    if not chaves:
+        raise SystemExit(f"❌ Nenhuma linha do índice {args.indice!r} em {args.csv}")
+
+    topo = max(ano * 12 + mes - 1 for ano, mes in chaves) + 1
+    dense = np.full(topo, np.nan, dtype=np.float64)
+    for (ind, ano, mes), val in prov._cache.items():
+        if ind == args.indice:
+            dense[ano * 12 + mes - 1] = float(val)
+
+    saida = npy_sidecar_path(args.csv, args.indice)
+    np.save(saida, dense)
+    print(f"✅ Gerado: {saida} ({len(chaves)} meses, {dense.nbytes / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,527 @@
+# -*- coding: utf-8 -*-
+"""
+Converte planilha do IPCA-E (ou similar) para 'indices.csv' no formato:
+  indice,ano,mes,variacao_mensal
+onde variacao_mensal é FRAÇÃO mensal (ex.: 0,21% -> 0.0021).
+
+Implementação compartilhada — gerar_indices_csv.py e
+gerar_indices_csv_1453.py são shims finos de CLI sobre este módulo.
+
+Exemplos:
+  python gerar_indices_csv.py --xls ipca-e_SerieHist/ipca-e_202509SerieHist.xls --sheet "SÉRIE HISTÓRICA" --indice "IPCA-E" --out indices.csv --header-row 3
+  (Opcional) debug:
+  python gerar_indices_csv.py --xls ipca-e_SerieHist/ipca-e_202509SerieHist.xls --sheet "SÉRIE HISTÓRICA" --indice "IPCA-E" --out indices.csv --header-row 3 --debug
+"""
+
+import argparse
+import csv
+import re
+import sys
+from functools import lru_cache
+from operator import itemgetter
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+# -----------------------------
+# Mapas e helpers
+# -----------------------------
+
+PT_MONTHS = {
+    "JAN": 1, "FEV": 2, "MAR": 3, "ABR": 4, "MAI": 5, "JUN": 6,
+    "JUL": 7, "AGO": 8, "SET": 9, "OUT": 10, "NOV": 11, "DEZ": 12,
+    "JANEIRO": 1, "FEVEREIRO": 2, "MARCO": 3, "MARÇO": 3, "ABRIL": 4,
+    "MAIO": 5, "JUNHO": 6, "JULHO": 7, "AGOSTO": 8, "SETEMBRO": 9,
+    "OUTUBRO": 10, "NOVEMBRO": 11, "DEZEMBRO": 12,
+}
+
+# qualquer sequência de espaços/quebras/NBSP vira um espaço só (uma passada
+# linear, no lugar do while "  " quadrático)
+_WS_RE = re.compile(r"[\s\xa0]+")
+
+def norm_str(x) -> str:
+    # remove quebras, NBSP e espaços duplicados
+    return _WS_RE.sub(" ", str(x)).strip()
+
+def to_int_safe(x):
+    # caminho quente primeiro: openpyxl/xlrd devolvem int/float direto
+    tx = type(x)
+    if tx is int:
+        return x
+    if tx is float:
+        if x != x:  # NaN sem passar pelo pandas
+            return None
+        try:
+            return int(round(x))  # muitos .xls trazem 1940.0
+        except (OverflowError, ValueError):
+            return None
+    if x is None or pd.isna(x):
+        return None
+
+    # strings "1940.0", " 1940 ", etc.
+    try:
+        s = str(x).strip()
+        if s.endswith(".0"):
+            s = s[:-2]
+        return int(s)
+    except Exception:
+        return None
+
+
+# limpeza do percentual em uma passada C: normaliza o sinal, descarta
+# %/espaços/quebras, tira o '.' de milhar e troca ',' decimal por '.'
+# (mesma sequência dos .replace encadeados que existiam aqui)
+_PCT_TRANS = str.maketrans({
+    "–": "-", "−": "-",
+    "%": None, " ": None, "\xa0": None, "\n": None, "\r": None, "\t": None,
+    ".": None, ",": ".",
+})
+
+def parse_percent_to_fraction(x):
+    """
+    Converte '0,21', '0,21 %', '0.21%', 0.21, '−0,22', '-0,22'
+    para FRAÇÃO float: 0.0021 (0,21%).
+    """
+    # float puro: a função roda uma vez por célula e o valor vira float no CSV
+    # de qualquer jeito — Decimal aqui era só custo (Decimal segue valendo na
+    # ponta do dinheiro, em indices_provider/app)
+    if x is None or (isinstance(x, float) and pd.isna(x)):
+        return None
+    s = str(x).translate(_PCT_TRANS)
+    try:
+        val = float(s)
+    except ValueError:
+        return None
+    return (val / 100.0) if abs(val) > 0.2 else val
+
+# tabela de tradução pré-montada: tira a pontuação em uma chamada C,
+# sem o loop de replaces
+_PUNCT_STRIP = str.maketrans("", "", ".,;:")
+
+def month_to_number(x):
+    if pd.isna(x):
+        return None
+    # remove pontuação/ruído simples
+    s = norm_str(x).upper().translate(_PUNCT_STRIP)
+    if s in PT_MONTHS:
+        return PT_MONTHS[s]
+    n = to_int_safe(s)
+    if n and 1 <= n <= 12:
+        return n
+    return None
+
+def normalize_sheet_arg(sheet):
+    if isinstance(sheet, str) and sheet.strip().isdigit():
+        return int(sheet.strip())
+    return sheet
+
+# -----------------------------
+# Leitura .XLS com xlrd direto
+# -----------------------------
+
+def read_xls_with_xlrd(xlsx_path: Path, sheet, header_row: int = 0,
+                       nrows: int = None, skiprows: int = None) -> pd.DataFrame:
+    import xlrd
+    from xlrd.xldate import xldate_as_datetime
+
+    book = xlrd.open_workbook(xlsx_path.as_posix())
+    if isinstance(sheet, str):
+        sh = book.sheet_by_name(sheet)
+    else:
+        sh = book.sheet_by_index(int(sheet) if isinstance(sheet, int) else 0)
+
+    # nrows limita as linhas de dados (além do cabeçalho); evita varrer a
+    # cauda da planilha quando só interessam as primeiras séries
+    first = header_row + (skiprows or 0)
+    last = sh.nrows if nrows is None else min(sh.nrows, first + 1 + nrows)
+    rows = []
+    datemode = book.datemode
+    for r in range(first, last):
+        # row_values/row_types devolvem a linha inteira em uma chamada C,
+        # sem alocar um objeto Cell por célula
+        row = sh.row_values(r)
+        types = sh.row_types(r)
+        if 3 in types:  # XL_CELL_DATE: converte só as células de data
+            for c, t in enumerate(types):
+                if t == 3:
+                    try:
+                        row[c] = xldate_as_datetime(row[c], datemode)
+                    except Exception:
+                        pass
+        rows.append(row)
+
+    if not rows:
+        raise RuntimeError("Planilha .xls sem conteúdo após header_row.")
+
+    header = [norm_str(h) for h in rows[0]]
+    data = rows[1:]
+    df = pd.DataFrame(data, columns=header)
+    return df
+
+# -----------------------------
+# Leitura .XLSX com openpyxl read_only
+# -----------------------------
+
+def read_xlsx_with_openpyxl(xlsx_path: Path, sheet, header_row: int = 0,
+                            nrows: int = None, skiprows: int = None) -> pd.DataFrame:
+    from itertools import islice
+
+    import openpyxl
+
+    # read_only + data_only: stream de valores, sem carregar estilos/fórmulas
+    # (o caminho pd.read_excel materializa o workbook inteiro na memória)
+    wb = openpyxl.load_workbook(xlsx_path.as_posix(), read_only=True, data_only=True)
+    try:
+        if isinstance(sheet, str):
+            ws = wb[sheet]
+        else:
+            ws = wb.worksheets[int(sheet) if isinstance(sheet, int) else 0]
+        # islice no iterador: as linhas puladas/da cauda nem são materializadas
+        first = header_row + (skiprows or 0)
+        last = None if nrows is None else first + 1 + nrows
+        rows = list(islice(ws.iter_rows(values_only=True), first, last))
+    finally:
+        wb.close()
+
+    if not rows:
+        raise RuntimeError("Planilha .xlsx sem conteúdo após header_row.")
+
+    header = [norm_str(h) for h in rows[0]]
+    df = pd.DataFrame(rows[1:], columns=header)
+    return df
+
+# -----------------------------
+# Parse direto de <table> com lxml
+# -----------------------------
+
+def _parse_html_table(html: str, table_index: int, header_row: int) -> pd.DataFrame:
+    """
+    Extrai uma <table> direto com lxml.html, sem o pipeline completo do
+    pd.read_html — para o .xls-HTML do IBGE só interessa uma tabela de texto.
+    """
+    import lxml.html
+
+    tree = lxml.html.fromstring(html)
+    tables = tree.xpath("//table")
+    if not tables:
+        raise RuntimeError("Sem <table> no HTML.")
+    t = tables[table_index if 0 <= table_index < len(tables) else 0]
+    data = [[td.text_content().strip() for td in tr.xpath("./td|./th")]
+            for tr in t.xpath(".//tr")]
+    data = data[header_row:]
+    if not data:
+        raise RuntimeError("Tabela vazia após header_row.")
+
+    header = [norm_str(h) for h in data[0]]
+    ncols = len(header)
+    # linhas curtas (colspan/células ausentes) completam com None
+    corpo = [r + [None] * (ncols - len(r)) if len(r) < ncols else r[:ncols]
+             for r in data[1:]]
+    return pd.DataFrame(corpo, columns=header)
+
+# -------- Leitura robusta (.xlsx/.xlsm/.xls-HTML) --------
+
+def read_any_excel(xlsx_path: Path, sheet, table_index: int = 0, encoding_hint: str = None,
+                   header_row: int = 0, nrows: int = None, skiprows: int = None,
+                   usecols: List[str] = None, debug=False):
+    from io import StringIO as _SIO
+
+    def subset(df):
+        # leitores que não passam pelo engine do pandas (openpyxl/xlrd/HTML):
+        # recorta as colunas depois da leitura; se algum nome não bater,
+        # devolve tudo e deixa a detecção usual decidir
+        if usecols and all(c in df.columns for c in usecols):
+            return df[list(usecols)]
+        return df
+
+    def try_html_like():
+        data = Path(xlsx_path).read_bytes()
+        encs = [encoding_hint] if encoding_hint else []
+        if not encs:
+            # detecção em uma passada (charset-normalizer, já presente via
+            # requests); a lista fixa vira só desempate se a detecção falhar
+            try:
+                from charset_normalizer import from_bytes
+                best = from_bytes(data).best()
+                if best and best.encoding:
+                    encs.append(best.encoding)
+            except Exception:
+                pass
+        for enc in ["utf-8", "cp1252", "latin-1", "iso-8859-1"]:
+            if enc not in encs:
+                encs.append(enc)
+        for enc in encs:
+            if not enc:
+                continue
+            try:
+                html = data.decode(enc, errors="ignore")
+            except UnicodeDecodeError:
+                continue
+            # 1º: parse direto da tabela com lxml (sem montar o pipeline do
+            # pd.read_html); os caminhos antigos ficam de último recurso
+            try:
+                return subset(_parse_html_table(html, table_index, header_row + (skiprows or 0)))
+            except Exception:
+                pass
+            try:
+                import lxml  # noqa
+                tables = pd.read_html(_SIO(html), flavor="lxml", header=header_row, skiprows=skiprows)
+                if tables:
+                    return subset(tables[table_index if 0 <= table_index < len(tables) else 0])
+            except Exception:
+                pass
+            try:
+                import bs4  # noqa
+                import html5lib  # noqa
+                tables = pd.read_html(_SIO(html), flavor="bs4", header=header_row, skiprows=skiprows)
+                if tables:
+                    return subset(tables[table_index if 0 <= table_index < len(tables) else 0])
+            except Exception:
+                pass
+        raise RuntimeError("Não consegui decodificar como HTML embutido.")
+
+    sheet = normalize_sheet_arg(sheet)
+    suffix = xlsx_path.suffix.lower()
+
+    if suffix in (".xlsx", ".xlsm"):
+        print("[INFO] Lendo como .xlsx/.xlsm via openpyxl (read_only)…")
+        try:
+            return subset(read_xlsx_with_openpyxl(Path(xlsx_path), sheet, header_row=header_row,
+                                                  nrows=nrows, skiprows=skiprows))
+        except Exception as e:
+            print(f"[AVISO] openpyxl não reconheceu como XLSX ({e}). Tentando como HTML embutido…")
+            return try_html_like()
+
+    if suffix == ".xls":
+        try:
+            print("[INFO] Lendo .xls diretamente com xlrd…")
+            return subset(read_xls_with_xlrd(Path(xlsx_path), sheet, header_row=header_row,
+                                             nrows=nrows, skiprows=skiprows))
+        except Exception as e1:
+            print(f"[AVISO] xlrd direto falhou ({e1}). Tentando como HTML embutido…")
+            try:
+                print("[INFO] Tentando ler .xls como HTML embutido…")
+                return try_html_like()
+            except Exception as e2:
+                print(f"[AVISO] HTML não funcionou ({e2}). Tentando engine xlrd via pandas (pode falhar)…")
+                try:
+                    import xlrd  # noqa
+                    return pd.read_excel(xlsx_path, sheet_name=sheet, engine="xlrd",
+                                         header=header_row, nrows=nrows, skiprows=skiprows,
+                                         usecols=usecols)
+                except Exception as e3:
+                    raise RuntimeError(f"Falha total ao ler '{xlsx_path}': {e3}")
+
+    print("[INFO] Tentando openpyxl (fallback)…")
+    return pd.read_excel(xlsx_path, sheet_name=sheet, engine="openpyxl",
+                         header=header_row, nrows=nrows, skiprows=skiprows, usecols=usecols)
+
+# -------- Detecção/transformação --------
+
+@lru_cache(maxsize=64)
+def _detect_from_headers(cols_norm: Tuple[str, ...]) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """Detecção pura sobre a tupla de cabeçalhos normalizados (memoizável)."""
+    cols_up = [c.upper() for c in cols_norm]
+
+    ano_candidates = [c for c in cols_up if "ANO" in c]
+    mes_candidates = [c for c in cols_up if "MÊS" in c or "MES" in c]
+    var_candidates = [c for c in cols_up if "VAR" in c or "%" in c or "MENSAL" in c]
+
+    ano_i = cols_up.index(ano_candidates[0]) if ano_candidates else None
+    mes_i = cols_up.index(mes_candidates[0]) if mes_candidates else None
+    var_i = cols_up.index(var_candidates[0]) if var_candidates else None
+    return ano_i, mes_i, var_i
+
+def detect_columns(df, debug=False) -> Tuple[str, str, str]:
+    cols_norm = tuple(norm_str(c) for c in df.columns)
+    if debug:
+        print("[DEBUG] Colunas lidas:", list(cols_norm))
+
+    # cabeçalhos iguais (lotes de abas/planilhas) reaproveitam a detecção
+    ano_i, mes_i, var_i = _detect_from_headers(cols_norm)
+    ano_col = df.columns[ano_i] if ano_i is not None else None
+    mes_col = df.columns[mes_i] if mes_i is not None else None
+    var_col = df.columns[var_i] if var_i is not None else None
+
+    if debug:
+        print(f"[DEBUG] ano_col={ano_col} | mes_col={mes_col} | var_col={var_col}")
+
+    return ano_col, mes_col, var_col
+
+def _percent_series_to_fraction(s: pd.Series) -> pd.Series:
+    """Versão vetorizada de parse_percent_to_fraction (coluna inteira em C)."""
+    txt = (s.astype("string")
+             .str.replace(r"[\s\xa0]+", "", regex=True)
+             .str.replace("–", "-", regex=False)
+             .str.replace("−", "-", regex=False)
+             .str.replace("%", "", regex=False)
+             .str.replace(".", "", regex=False)
+             .str.replace(",", ".", regex=False))
+    val = pd.to_numeric(txt, errors="coerce")
+    # float64 "cru": to_numeric sobre dtype string devolve Int64/Float64
+    # anuláveis, que não aceitam o mask com float
+    val = pd.Series(val.to_numpy(dtype="float64", na_value=float("nan")), index=val.index)
+    return val.mask(val.abs() > 0.2, val / 100.0)
+
+def _month_series_to_number(s: pd.Series) -> pd.Series:
+    """Versão vetorizada de month_to_number."""
+    txt = (s.astype("string")
+             .str.replace(r"[\s\xa0]+", " ", regex=True)
+             .str.strip()
+             .str.upper()
+             .str.replace(r"[.,;:]", "", regex=True))
+    num = pd.to_numeric(txt.map(PT_MONTHS), errors="coerce")
+    num = num.fillna(pd.to_numeric(txt, errors="coerce"))
+    num = pd.Series(num.to_numpy(dtype="float64", na_value=float("nan")), index=num.index)
+    return num.where((num >= 1) & (num <= 12))
+
+def tidy_rows(df, ano_col, mes_col, var_col, debug=False) -> List[Tuple[int, int, float]]:
+    # colunas inteiras de uma vez, sem o iterrows linha a linha; o ffill fica
+    # na expressão, sem reescrever a coluna no DataFrame para ler de volta
+    ano = pd.to_numeric(df[ano_col].ffill(), errors="coerce").round()
+    mes = _month_series_to_number(df[mes_col])
+    var = _percent_series_to_fraction(df[var_col])
+    ok = ano.notna() & (ano != 0) & mes.notna() & var.notna()
+    rows = list(zip(ano[ok].astype(int).tolist(),
+                    mes[ok].astype(int).tolist(),
+                    var[ok].astype(float).tolist()))
+    if debug:
+        print(f"[DEBUG] linhas válidas encontradas: {len(rows)}")
+        print("[DEBUG] amostra:", rows[:5])
+    return rows
+
+def wide_to_tidy(df, debug=False) -> List[Tuple[int, int, float]]:
+    ano_col = None
+    for c in df.columns:
+        if "ANO" in norm_str(c).upper():
+            ano_col = c
+            break
+    if not ano_col:
+        return []
+    month_cols = [c for c in df.columns if norm_str(c).upper() in PT_MONTHS]
+    if not month_cols:
+        return []
+    # melt: a planilha larga vira (ano, mes, var) em uma operação e o parse
+    # roda por coluna inteira; a ordenação final acontece em build_indices_csv
+    # (o ffill do ano entra via assign, sem mutar o df do chamador)
+    col_map = {mc: month_to_number(mc) for mc in month_cols}
+    m = (df.assign(**{ano_col: df[ano_col].ffill()})
+           .melt(id_vars=[ano_col], value_vars=month_cols, var_name="_mc", value_name="_var"))
+    ano = pd.to_numeric(m[ano_col], errors="coerce").round()
+    mes = m["_mc"].map(col_map)
+    var = _percent_series_to_fraction(m["_var"])
+    ok = ano.notna() & (ano != 0) & mes.notna() & var.notna()
+    rows = list(zip(ano[ok].astype(int).tolist(),
+                    mes[ok].astype(int).tolist(),
+                    var[ok].astype(float).tolist()))
+    if debug:
+        print(f"[DEBUG] wide->tidy linhas: {len(rows)} | meses detectados: {[norm_str(c) for c in month_cols]}")
+    return rows
+
+# -------- Pipeline principal --------
+
+def build_indices_csv(xlsx_path, sheet_name, out_csv, indice_nome,
+                      ano_col=None, mes_col=None, var_col=None,
+                      table_index: int = 0, encoding_hint: str = None,
+                      header_row: int = 0, nrows: int = None, skiprows: int = None,
+                      usecols: List[str] = None, debug: bool = False):
+    # com as três colunas conhecidas, o leitor pode descartar o resto da
+    # planilha já na leitura
+    if usecols is None and ano_col and mes_col and var_col:
+        usecols = [ano_col, mes_col, var_col]
+    df = read_any_excel(Path(xlsx_path), sheet_name, table_index=table_index,
+                        encoding_hint=encoding_hint, header_row=header_row,
+                        nrows=nrows, skiprows=skiprows, usecols=usecols, debug=debug)
+
+    df.columns = [norm_str(c) for c in df.columns]
+
+    rows = []
+    if ano_col and mes_col and var_col and all(c in df.columns for c in (ano_col, mes_col, var_col)):
+        if debug:
+            print("[DEBUG] Usando colunas passadas via CLI.")
+        rows = tidy_rows(df, ano_col, mes_col, var_col, debug=debug)
+    else:
+        d_ano, d_mes, d_var = detect_columns(df, debug=debug)
+        if d_ano and d_mes and d_var:
+            rows = tidy_rows(df, d_ano, d_mes, d_var, debug=debug)
+
+    if not rows:
+        rows = wide_to_tidy(df, debug=debug)
+
+    if not rows:
+        raise RuntimeError(
+            "Não foi possível detectar dados. "
+            "Use --year-col/--month-col/--var-col, ou ajuste --table-index/--encoding-hint/--header-row (tente 3, 4 ou 5)."
+        )
+
+    rows.sort(key=itemgetter(0, 1))  # chave em C, sem lambda por comparação
+
+    # csv.writer direto: sem materializar lista de dicts + DataFrame só para
+    # gravar 4 colunas já ordenadas
+    with open(out_csv, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f, lineterminator="\n")
+        w.writerow(["indice", "ano", "mes", "variacao_mensal"])
+        w.writerows((indice_nome, a, m, float(v)) for (a, m, v) in rows)
+    print(f"[OK] Gerado: {out_csv} ({len(rows)} linhas)")
+    print(f"{'indice':>6} {'ano':>5} {'mes':>4} {'variacao_mensal':>16}")
+    for a, m, v in rows[:12]:
+        print(f"{indice_nome:>6} {a:>5} {m:>4} {float(v):>16}")
+
+# -------- CLI --------
+
+def main():
+    ap = argparse.ArgumentParser(description="Converter planilha do IPCA-E (ou similar) para indices.csv")
+    ap.add_argument("--xlsx", required=False, help="Caminho da planilha (.xlsx/.xls ou .xls-HTML)")
+    ap.add_argument("--xls", dest="xlsx", required=False, help="(Alias) Caminho da planilha .xls")
+    ap.add_argument("--sheet", default=0, help="Nome da aba (ou índice). Para .xls-HTML, use 0 (primeira tabela).")
+    ap.add_argument("--indice", default="IPCA-E", help="Nome do índice a gravar (default: IPCA-E)")
+    ap.add_argument("--out", default="indices.csv", help="Arquivo CSV de saída (default: indices.csv)")
+    ap.add_argument("--year-col", dest="year_col", default=None, help="Nome exato da coluna 'Ano' (opcional)")
+    ap.add_argument("--month-col", dest="month_col", default=None, help="Nome exato da coluna 'Mês' (opcional)")
+    ap.add_argument("--var-col", dest="var_col", default=None, help="Nome exato da coluna de variação mensal (opcional)")
+    ap.add_argument("--table-index", dest="table_index", type=int, default=0, help="Índice da tabela no HTML (default: 0)")
+    ap.add_argument("--encoding-hint", dest="encoding_hint", default=None, help="Forçar encoding (ex.: cp1252, latin-1)")
+    ap.add_argument("--header-row", dest="header_row", type=int, default=0,
+                    help="Linha do cabeçalho (0-based). Ex.: se o cabeçalho está na linha 5 do Excel, use --header-row 4")
+    ap.add_argument("--nrows", type=int, default=None,
+                    help="Limita a leitura às N primeiras linhas de dados (opcional)")
+    ap.add_argument("--skiprows", type=int, default=None,
+                    help="Pula N linhas antes do cabeçalho (opcional)")
+    ap.add_argument("--usecols", default=None,
+                    help="Lista de colunas a ler, separadas por vírgula (opcional)")
+    ap.add_argument("--debug", action="store_true", help="Exibe colunas, amostras e caminhos de detecção")
+    args = ap.parse_args()
+
+    if not args.xlsx:
+        print("[ERRO] Informe o caminho da planilha com --xlsx (ou --xls).")
+        sys.exit(1)
+
+    xlsx_path = Path(args.xlsx)
+    if not xlsx_path.exists():
+        print(f"[ERRO] Arquivo não encontrado: {xlsx_path}")
+        sys.exit(1)
+
+    try:
+        build_indices_csv(
+            xlsx_path=xlsx_path,
+            sheet_name=args.sheet,
+            out_csv=args.out,
+            indice_nome=args.indice,
+            ano_col=args.year_col,
+            mes_col=args.month_col,
+            var_col=args.var_col,
+            table_index=args.table_index,
+            encoding_hint=args.encoding_hint,
+            header_row=args.header_row,
+            nrows=args.nrows,
+            skiprows=args.skiprows,
+            usecols=[c.strip() for c in args.usecols.split(",")] if args.usecols else None,
+            debug=args.debug,
+        )
+    except Exception as e:
+        print(f"[ERRO] {e}")
+        sys.exit(2)
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,25 @@ from datetime import date
 from typing import List, Dict, Tuple, Optional
 import csv
 import os
+import pickle
+
+import numpy as np
+from numba import njit
+
+def npy_sidecar_path(csv_path: str, indice: str) -> str:
+    """Caminho do array denso pré-gerado (ver gerar_indices_npy.py)."""
+    return f"{csv_path}.{indice}.npy"
+
+# kernel numérico do acúmulo mensal: prod(1+v) - 1 sobre o array que
+# get_series devolve; assinatura explícita compila no import e cache=True
+# amortiza a compilação entre execuções do CLI (só o kernel é jitado —
+# parsing de CSV/strings fica fora)
+@njit("float64(float64[:])", cache=True, fastmath=True)
+def compound(series):
+    acc = 1.0
+    for v in series:
+        acc *= 1.0 + v
+    return acc - 1.0
 
 @dataclass(frozen=True)
 class Mensal:
@@ -22,7 +41,11 @@ class IndicesProvider:
     def __init__(self, csv_path: str = "indices.csv"):
         self.csv_path = csv_path
         self._cache: Dict[Tuple[str,int,int], Decimal] = {}
+        # por índice: (base, array float64 indexado por ano*12+mes-1 - base)
+        self._arr: Dict[str, Tuple[int, np.ndarray]] = {}
         self._loaded = False
+        # arrays densos memmapeados por índice (False = sidecar ausente)
+        self._dense: Dict[str, object] = {}
 
     def _load(self):
         if self._loaded:
@@ -32,6 +55,18 @@ class IndicesProvider:
                 f"Arquivo {self.csv_path} não encontrado. "
                 "Crie um CSV com colunas: indice,ano,mes,variacao_mensal"
             )
+        # cache pickled do parse: invocações repetidas (CLI) pagam um único
+        # pickle.load em vez de DictReader + Decimal linha a linha
+        pkl_path = f"{self.csv_path}.pkl"
+        try:
+            if os.path.getmtime(pkl_path) >= os.path.getmtime(self.csv_path):
+                with open(pkl_path, "rb") as f:
+                    self._cache = pickle.load(f)
+                self._build_arrays()
+                self._loaded = True
+                return
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass  # sem cache (ou corrompido): parseia o CSV normalmente
         with open(self.csv_path, newline="", encoding="utf-8") as f:
             reader = csv.DictReader(f)
             for row in reader:
@@ -52,27 +87,91 @@ class IndicesProvider:
                     val = (val / Decimal("100"))
 
                 self._cache[(indice, ano, mes)] = val
+        self._build_arrays()
         self._loaded = True
+        try:
+            with open(pkl_path, "wb") as f:
+                pickle.dump(self._cache, f, protocol=5)
+        except OSError:
+            pass  # diretório somente leitura: segue sem o sidecar
 
+    def _build_arrays(self):
+        """
+        Converte o dicionário parseado em um array denso float64 por índice
+        (posição = ano*12 + mes-1 - base, NaN nos meses faltantes): get_series
+        vira uma fatia contígua em vez de N sondagens de dict.
+        """
+        self._arr = {}
+        por_indice: Dict[str, list] = {}
+        for (ind, ano, mes), val in self._cache.items():
+            por_indice.setdefault(ind, []).append((ano * 12 + mes - 1, float(val)))
+        for ind, itens in por_indice.items():
+            base = min(i for i, _ in itens)
+            topo = max(i for i, _ in itens)
+            arr = np.full(topo - base + 1, np.nan, dtype=np.float64)
+            for i, v in itens:
+                arr[i - base] = v
+            self._arr[ind] = (base, arr)
 
-    def get_series(self, indice: str, start: date, end: date) -> List[Decimal]:
+    def _dense_for(self, indice: str):
         """
-        Retorna lista de variações mensais (fração) de start..end-1 (mês a mês).
+        Array denso pré-gerado por gerar_indices_npy.py (posição = ano*12 + mes-1).
+        Aberto com mmap_mode="r": sob vários workers (uvicorn/gunicorn) as páginas
+        ficam no page cache do kernel e são compartilhadas, em vez de cada worker
+        materializar o dicionário inteiro.
+        """
+        arr = self._dense.get(indice)
+        if arr is None:
+            path = npy_sidecar_path(self.csv_path, indice)
+            if (os.path.exists(path) and os.path.exists(self.csv_path)
+                    and os.path.getmtime(path) >= os.path.getmtime(self.csv_path)):
+                arr = np.load(path, mmap_mode="r")
+            else:
+                arr = False
+            self._dense[indice] = arr
+        return arr if arr is not False else None
+
+    def get_series(self, indice: str, start: date, end: date) -> np.ndarray:
+        """
+        Retorna array float64 de variações mensais (fração) de start..end-1.
         end é exclusivo (boa prática para intervalos).
         """
+        # índices inteiros de mês (ano*12 + mes-1): nenhuma aritmética de date
+        # mês a mês no caminho quente
+        i0 = start.year * 12 + start.month - 1
+        i1 = end.year * 12 + end.month - 1
+        if i1 <= i0:
+            return np.empty(0, dtype=np.float64)
+        dense = self._dense_for(indice)
+        if dense is not None:
+            if 0 <= i0 and i1 <= len(dense):
+                fatia = np.asarray(dense[i0:i1], dtype=np.float64)
+                if not np.isnan(fatia).any():
+                    return fatia
+            # intervalo fora do array (ou mês faltando) → cai para o CSV
         self._load()
-        cur = date(start.year, start.month, 1)
-        series = []
-        while cur < end:
-            key = (indice, cur.year, cur.month)
-            if key not in self._cache:
-                raise KeyError(f"Série ausente p/ {indice} {cur.year}-{cur.month:02d} no CSV.")
-            series.append(self._cache[key])
-            # avança 1 mês
-            ny = cur.year + (1 if cur.month == 12 else 0)
-            nm = 1 if cur.month == 12 else cur.month + 1
-            cur = date(ny, nm, 1)
-        return series
+        entry = self._arr.get(indice)
+        if entry is None:
+            raise KeyError(f"Série ausente p/ {indice} {start.year}-{start.month:02d} no CSV.")
+        base, arr = entry
+        # aponta o PRIMEIRO mês faltante, como o loop mês a mês fazia
+        faltante = None
+        if i0 < base:
+            faltante = i0
+        else:
+            fatia = arr[i0 - base:min(i1, base + len(arr)) - base]
+            nans = np.isnan(fatia)
+            if nans.any():
+                faltante = i0 + int(nans.argmax())
+            elif i1 > base + len(arr):
+                # se o intervalo começa já depois do fim da série, o primeiro
+                # mês pedido (i0) é o faltante, não o mês seguinte ao último
+                faltante = max(i0, base + len(arr))
+        if faltante is not None:
+            raise KeyError(
+                f"Série ausente p/ {indice} {faltante // 12}-{faltante % 12 + 1:02d} no CSV."
+            )
+        return fatia
 
 def split_periodos(provider: IndicesProvider,
                    indice: str,
@@ -85,6 +184,7 @@ def split_periodos(provider: IndicesProvider,
     Se não houver 'graça', passe None/None que devolve [].
     """
     antes = provider.get_series(indice, inicio_antes, fim_antes)
-    graca = provider.get_series(indice, inicio_graca, fim_graca) if (inicio_graca and fim_graca) else []
+    graca = (provider.get_series(indice, inicio_graca, fim_graca)
+             if (inicio_graca and fim_graca) else np.empty(0, dtype=np.float64))
     pos   = provider.get_series(indice, inicio_pos, fim_pos)
     return antes, graca, pos
@@ -1,24 +1,30 @@
 # -*- coding: utf-8 -*-
 """
 main.py
-Lê esaj_detalhe_processos, imprime, chama app_4.py, PARSEIA a saída de forma robusta
+Lê esaj_detalhe_processos, imprime, calcula via app_4 importado (in-process)
 e INSERE em esaj_calc_precatorio_resumo (com coalesce p/ NOT NULL).
+
+O caminho antigo (fork de `python app_4.py` + parse da saída de texto) segue
+disponível com --subprocess, para conferência.
 """
 
 from __future__ import annotations
+import io
 import os
 import sys
 import re
 import unicodedata
 import argparse
 import subprocess
-from typing import Optional, Dict, Any
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional, Dict
 
 from dotenv import load_dotenv
 import psycopg2
-from psycopg2.extras import RealDictCursor
 from decimal import Decimal
 
+from app_4 import compute as app4_compute
+
 
 # ---------------------- CONFIG ----------------------
 load_dotenv()
@@ -34,6 +40,13 @@ DB_CONFIG = {
 OVERRIDE_ANTES = os.getenv("OVERRIDE_ANTES")
 OVERRIDE_POS = os.getenv("OVERRIDE_POS_IPCA")
 
+# constantes do caminho --subprocess: fixas pela vida do processo, então o
+# abspath (stat) e o join não precisam rodar a cada chamada
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_APP4_PATH = os.path.join(_SCRIPT_DIR, "app_4.py")
+_PYTHON_BIN = sys.executable or "python"
+_BASE_CMD = [_PYTHON_BIN, _APP4_PATH]
+
 # ---------------------- QUERY -----------------------
 DEFAULT_SQL = """
 SELECT
@@ -70,57 +83,75 @@ def _to_number_str_money(v) -> str:
 
     return s or "0"
 
-def _to_number_str_factor(v) -> str:
-    """Para fatores: mantém ponto decimal; troca vírgula por ponto (se vier)."""
-    if v is None:
-        return "0"
-    s = str(v).strip().replace(",", ".")
-    return s
-
 def _to_int_year(v) -> int:
     try:
         return int(float(v))
     except Exception:
         return int(str(v)[:4])
 
+# tabela de combining marks do BMP (cobre os diacríticos que o NFKD gera em
+# texto pt-BR), montada uma vez no import: str.translate descarta tudo num
+# loop em C, sem o generator + chamada unicodedata.combining() por caractere
+_COMBINING = {c: None for c in range(0x10000) if unicodedata.combining(chr(c))}
+
 def _strip_accents_lower(s: str) -> str:
     """Normaliza: remove acentos e deixa minúsculo (para matching robusto)."""
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(ch for ch in s if not unicodedata.combining(ch))
-    return s.lower()
-
-def _num_token(line: str) -> str | None:
-    """
-    Retorna o *primeiro* token numérico contendo ao menos um dígito.
-    Evita capturar apenas '............' (sem dígitos).
-    """
-    m = re.search(r"(\d[\d\.,]*)", line)
-    return m.group(1) if m else None
-
-def _coalesce_payload(d: Dict[str, Any]) -> Dict[str, Any]:
-    """Garante que campos NOT NULL não sejam None (usa 0/0.0)."""
-    numeric_float_keys = [
-        "fator_ipcae_antes","fator_ipcae_pos","fator_juros_2aa_simples",
-        "principal_original","principal_apos_antes","principal_pos_ipca","principal_final_ipca_2aa",
-        "juros_mora_anteriores_base","juros_mora_apos_antes","juros_mora_final_corrigido",
-        "total_corrigido"
-    ]
-    numeric_int_keys = ["meses_para_2aa"]
-    out = dict(d)
-    for k in numeric_float_keys:
-        if out.get(k) is None:
-            out[k] = 0.0
-    for k in numeric_int_keys:
-        if out.get(k) is None:
-            out[k] = 0
-    return out
+    if s.isascii():
+        # teste O(n) em C, sem alocação: ASCII puro não tem o que normalizar
+        return s.lower()
+    return unicodedata.normalize("NFKD", s).translate(_COMBINING).lower()
 
 # ---------------------- PARSER DA SAÍDA ----------------------
+# Um único regex com alternância nomeada: cada alternativa é "âncora do campo
+# + primeiro token numérico da linha" (dinheiro exige o 'r$' na frente). A
+# saída inteira é varrida numa passada de finditer, no lugar do loop
+# linha-a-linha com ~12 testes de substring cada.
+_MONEY_VAL = r"[^\n]*?r\$\s*(?P<{k}>\d[\d\.,]*)"
+_FACTOR_VAL = r"[^\n]*?(?P<{k}>\d[\d\.,]*)"
+
+_BIG_RE = re.compile("|".join((
+    r"fator ipca-e antes" + _FACTOR_VAL.format(k="fator_ipcae_antes"),
+    r"fator ipca-e pos" + _FACTOR_VAL.format(k="fator_ipcae_pos"),
+    r"fator 2% a[\. ]?a" + _FACTOR_VAL.format(k="fator_juros_2aa_simples"),
+    r"meses\s*para\s*2%=\s*(?P<meses_para_2aa>\d+)",
+    r"principal original" + _MONEY_VAL.format(k="principal_original"),
+    r"principal apos antes" + _MONEY_VAL.format(k="principal_apos_antes"),
+    r"principal pos \(?ipca\)?" + _MONEY_VAL.format(k="principal_pos_ipca"),
+    r"principal final \(ipca\+2\s?%\)" + _MONEY_VAL.format(k="principal_final_ipca_2aa"),
+    r"juros mora anteriores" + _MONEY_VAL.format(k="juros_mora_anteriores_base"),
+    r"juros mora apos antes" + _MONEY_VAL.format(k="juros_mora_apos_antes"),
+    r"juros mora final" + _MONEY_VAL.format(k="juros_mora_final_corrigido"),
+    r"total corrigido" + _MONEY_VAL.format(k="total_corrigido"),
+)))
+
+# o token do regex só tem dígitos, '.' e ',': a tabela descarta o milhar e
+# troca a vírgula decimal numa única passada em C (sem as duas .replace())
+_MONEY_TRANS = str.maketrans({".": None, ",": "."})
+
+def _conv_money(tok: str) -> Decimal:
+    # dinheiro em pt-BR: remove milhar, vírgula vira ponto; Decimal preserva
+    # os centavos e entra como numeric no banco sem passar por float
+    return Decimal(tok.translate(_MONEY_TRANS))
+
+def _conv_factor(tok: str) -> float:
+    return float(tok.replace(",", "."))
+
+# conversor por campo, indexado pelo lastgroup do match (tabela > cascata de if)
+_CONVERTERS = {k: _conv_money for k in (
+    "principal_original", "principal_apos_antes", "principal_pos_ipca",
+    "principal_final_ipca_2aa", "juros_mora_anteriores_base",
+    "juros_mora_apos_antes", "juros_mora_final_corrigido", "total_corrigido",
+)}
+_CONVERTERS.update({k: _conv_factor for k in (
+    "fator_ipcae_antes", "fator_ipcae_pos", "fator_juros_2aa_simples",
+)})
+_CONVERTERS["meses_para_2aa"] = int
+
 def parse_app4_output(output: str) -> dict:
     """
-    Parser linha-a-linha, tolerante a variações.
-    - Usa _num_token() para garantir que há dígitos no token capturado.
-    - Para dinheiro, ancora em 'R$' e aplica normalização pt-BR -> US.
+    Extrai os 12 campos da saída de texto do app_4 (caminho --subprocess).
+    Normaliza a saída inteira uma vez (acentos fora, minúsculas) e aplica um
+    finditer do regex de alternância; m.lastgroup diz qual campo casou.
     """
     result = {
         "fator_ipcae_antes": None,
@@ -137,106 +168,45 @@ def parse_app4_output(output: str) -> dict:
         "total_corrigido": None,
     }
 
-    def _to_number_str_money(v) -> str:
-        s = str(v).strip().replace("R$", "").replace(" ", "")
-        return s.replace(".", "").replace(",", ".")
-
-    def _to_number_str_factor(v) -> str:
-        return str(v).strip().replace(",", ".")
-
-    lines = output.splitlines()
-    for raw in lines:
-        line = raw.strip().replace("\xa0", " ")
-        norm = _strip_accents_lower(line)
-        norm_clean = re.sub(r"\.+", " ", norm)
-        norm_clean = re.sub(r"\s+", " ", norm_clean)
-
-        # -------- FATORES --------
-        if "fator ipca-e antes" in norm_clean:
-            tok = _num_token(line)
-            if tok:
-                result["fator_ipcae_antes"] = float(_to_number_str_factor(tok))
-            continue
-
-        if "fator ipca-e pos" in norm_clean:
-            tok = _num_token(line)
-            if tok:
-                result["fator_ipcae_pos"] = float(_to_number_str_factor(tok))
-            continue
-
-        if "fator 2% a.a" in norm_clean or "fator 2% a a" in norm_clean:
-            tok = _num_token(line)
-            if tok:
-                result["fator_juros_2aa_simples"] = float(_to_number_str_factor(tok))
-            m2 = re.search(r"meses\s*para\s*2%=\s*(\d+)", norm_clean)
-            if m2:
-                result["meses_para_2aa"] = int(m2.group(1))
-            continue
-
-        # -------- PRINCIPAIS (DINHEIRO) --------
-        if norm_clean.startswith("principal original"):
-            m = re.search(r"R\$\s*(\d[\d\.,]*)", line)
-            if m:
-                result["principal_original"] = float(_to_number_str_money(m.group(1)))
-            continue
-
-        if "principal apos antes" in norm_clean:
-            m = re.search(r"R\$\s*(\d[\d\.,]*)", line)
-            if m:
-                result["principal_apos_antes"] = float(_to_number_str_money(m.group(1)))
-            continue
-
-        if "principal pos (ipca)" in norm_clean or "principal pos ipca" in norm_clean:
-            m = re.search(r"R\$\s*(\d[\d\.,]*)", line)
-            if m:
-                result["principal_pos_ipca"] = float(_to_number_str_money(m.group(1)))
-            continue
-
-        if "principal final (ipca+2%)" in norm_clean or "principal final (ipca+2 %)" in norm_clean:
-            m = re.search(r"R\$\s*(\d[\d\.,]*)", line)
-            if m:
-                result["principal_final_ipca_2aa"] = float(_to_number_str_money(m.group(1)))
-            continue
-
-        # -------- JUROS (DINHEIRO) --------
-        if "juros mora anteriores" in norm_clean:
-            m = re.search(r"R\$\s*(\d[\d\.,]*)", line)
-            if m:
-                result["juros_mora_anteriores_base"] = float(_to_number_str_money(m.group(1)))
-            continue
-
-        if "juros mora apos antes" in norm_clean:
-            m = re.search(r"R\$\s*(\d[\d\.,]*)", line)
-            if m:
-                result["juros_mora_apos_antes"] = float(_to_number_str_money(m.group(1)))
-            continue
-
-        if norm_clean.startswith("juros mora final"):
-            m = re.search(r"R\$\s*(\d[\d\.,]*)", line)
-            if m:
-                result["juros_mora_final_corrigido"] = float(_to_number_str_money(m.group(1)))
-            continue
-
-        # -------- TOTAL CORRIGIDO (DINHEIRO) --------
-        if "total corrigido" in norm_clean or "valor total corrigido" in norm_clean:
-            m = re.search(r"R\$\s*(\d[\d\.,]*)", line)
-            if m:
-                result["total_corrigido"] = float(_to_number_str_money(m.group(1)))
-            continue
-
+    converters = _CONVERTERS  # LOAD_FAST dentro do loop, sem LOAD_GLOBAL
+    remaining = len(result)
+    for m in _BIG_RE.finditer(_strip_accents_lower(output)):
+        key = m.lastgroup
+        if result[key] is None:
+            remaining -= 1
+        result[key] = converters[key](m.group(key))
+        if remaining == 0:
+            # os 12 campos já vieram: sob --debug ainda sobra cauda de saída
+            # que não precisa ser varrida
+            break
     return result
 
 # ---------------------- EXEC APP4 --------------------
-def call_app4_and_parse(principal: str, ano_venc: int, juros_mora_ant: str,
+def call_app4_inprocess(principal: str, ano_venc: int, juros_mora_ant: str,
                         indices_csv: str = "indices_ipcae.csv",
                         verbose: bool = False) -> Dict[str, float]:
-    """Executa app_4.py e retorna dicionário com valores extraídos da saída."""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    app4_path = os.path.join(script_dir, "app_4.py")
-    python_bin = sys.executable or "python"
+    """
+    Chama o cálculo do app_4 importado, sem fork nem parse de stdout.
+    Elimina o custo por linha de (startup do interpretador + releitura do CSV
+    + regex na saída); o CSV fica cacheado dentro do próprio app_4.
+    """
+    result = app4_compute(
+        principal=Decimal(principal or "0"),
+        ano_venc=ano_venc,
+        juros_mora_ant=Decimal(juros_mora_ant or "0"),
+        indices_csv=indices_csv,
+        override_antes=Decimal(OVERRIDE_ANTES) if OVERRIDE_ANTES else None,
+        override_pos_ipca=Decimal(OVERRIDE_POS) if OVERRIDE_POS else None,
+    )
+    if verbose:
+        print("[CALC]", result)
+    return result
 
-    cmd = [
-        python_bin, app4_path,
+def call_app4_and_parse(principal: str, ano_venc: int, juros_mora_ant: str,
+                        indices_csv: str = "indices_ipcae.csv",
+                        verbose: bool = False) -> Dict[str, float]:
+    """Executa app_4.py (subprocesso) e retorna dicionário extraído da saída."""
+    cmd = _BASE_CMD + [
         "--principal", principal,
         "--ano-venc", str(ano_venc),
         "--indices-csv", indices_csv,
@@ -251,11 +221,18 @@ def call_app4_and_parse(principal: str, ano_venc: int, juros_mora_ant: str,
     if verbose:
         print("\n[EXEC] ", " ".join(cmd))
 
-    proc = subprocess.run(cmd, capture_output=True, text=True)
-    if proc.stderr:
-        print(proc.stderr)
-    output = proc.stdout or ""
-    print(output)
+    # bytes crus com buffer de 64 KiB: a saída é lida em blocos grandes pelo
+    # communicate() e decodificada uma única vez no fim, sem o decode
+    # incremental por linha do modo text=True
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            bufsize=65536)
+    out, err = proc.communicate()
+    if err and verbose:
+        sys.stderr.write(err.decode("utf-8", errors="replace"))
+    output = out.decode("utf-8", errors="replace") if out else ""
+    if verbose:
+        # despejar a saída inteira do app_4 por linha serializa o lote no TTY
+        sys.stdout.write(output)
 
     result = parse_app4_output(output)
     if verbose:
@@ -263,130 +240,216 @@ def call_app4_and_parse(principal: str, ano_venc: int, juros_mora_ant: str,
     return result
 
 # ---------------------- DB SAVE ----------------------
-def insert_calc_result(conn, id_registro: int, cpf: str, numero_processo: str, result: Dict[str, float], verbose: bool = False):
-    """
-    Insere em esaj_calc_precatorio_resumo e, na mesma transação, faz UPDATE
-    em esaj_detalhe_processos.process_calculo = true. Se qualquer passo falhar,
-    tudo é revertido (rollback).
-    """
-    sql_insert = """
-        INSERT INTO public.esaj_calc_precatorio_resumo (
-            cpf,
-            numero_processo_cnj,
-            fator_ipcae_antes,
-            fator_ipcae_pos,
-            fator_juros_2aa_simples,
-            meses_para_2aa,
-            principal_original,
-            principal_apos_antes,
-            principal_pos_ipca,
-            principal_final_ipca_2aa,
-            juros_mora_anteriores_base,
-            juros_mora_apos_antes,
-            juros_mora_final_corrigido,
-            total_corrigido
-        ) VALUES (
-            %(cpf)s,
-            %(numero_processo_cnj)s,
-            %(fator_ipcae_antes)s,
-            %(fator_ipcae_pos)s,
-            %(fator_juros_2aa_simples)s,
-            %(meses_para_2aa)s,
-            %(principal_original)s,
-            %(principal_apos_antes)s,
-            %(principal_pos_ipca)s,
-            %(principal_final_ipca_2aa)s,
-            %(juros_mora_anteriores_base)s,
-            %(juros_mora_apos_antes)s,
-            %(juros_mora_final_corrigido)s,
-            %(total_corrigido)s
-        )
-    """
+# Tamanho do lote: acima de ~500 linhas por VALUES o ganho no PostgreSQL satura
+BATCH_SIZE = 500
+
+_INSERT_COLS = (
+    "cpf",
+    "numero_processo_cnj",
+    "fator_ipcae_antes",
+    "fator_ipcae_pos",
+    "fator_juros_2aa_simples",
+    "meses_para_2aa",
+    "principal_original",
+    "principal_apos_antes",
+    "principal_pos_ipca",
+    "principal_final_ipca_2aa",
+    "juros_mora_anteriores_base",
+    "juros_mora_apos_antes",
+    "juros_mora_final_corrigido",
+    "total_corrigido",
+)
+
+# zero tipado por coluna (colunas NOT NULL no destino): supre campos que o
+# parser do caminho --subprocess não extraiu — compute() nunca devolve None.
+# Pré-zipado com os nomes para o preenchimento ser uma passada única, sem o
+# dict intermediário que o antigo _coalesce_payload copiava por linha.
+_FACTOR_COLS = frozenset(("fator_ipcae_antes", "fator_ipcae_pos", "fator_juros_2aa_simples"))
+_COLS_E_ZEROS = tuple(
+    (c, 0 if c == "meses_para_2aa" else (0.0 if c in _FACTOR_COLS else Decimal("0")))
+    for c in _INSERT_COLS[2:]
+)
+
+SQL_COPY_LOTE = (
+    f"COPY public.esaj_calc_precatorio_resumo ({', '.join(_INSERT_COLS)}) "
+    "FROM STDIN WITH (FORMAT text)"
+)
+
+SQL_UPDATE_LOTE = """
+    UPDATE public.esaj_detalhe_processos
+    SET process_calculo = true
+    WHERE id = ANY(%s)
+"""
 
-    sql_update = """
-        UPDATE public.esaj_detalhe_processos
-        SET process_calculo = true
-        WHERE id = %s
+def flush_results(conn, pending: list, pending_ids: list, verbose: bool = False):
     """
-
-    data = {"cpf": cpf, "numero_processo_cnj": numero_processo, **_coalesce_payload(result)}
-
-    # Transação por linha: se algo falhar, rollback garante atomicidade
+    Grava um lote acumulado: um COPY ... FROM STDIN (TSV montado em memória) e
+    um único UPDATE ... WHERE id = ANY(ids), na mesma transação. COPY dispensa
+    o parse/encode de SQL por valor do INSERT multi-VALUES; se algo falhar, o
+    lote inteiro sofre rollback (nenhum id fica marcado sem resumo gravado).
+    Retorna True se o lote foi gravado (ou estava vazio).
+    """
+    if not pending:
+        return True
+    # TSV manual em vez de csv.writer: os campos são números e dígitos de
+    # CPF/CNJ (sem tab/quebra), e o formato text do COPY não entende aspas
+    buf = io.StringIO()
+    write = buf.write
+    for tup in pending:
+        write("\t".join(r"\N" if v is None else str(v) for v in tup))
+        write("\n")
+    buf.seek(0)
     try:
         with conn:  # inicia uma transação; commit automático ao sair se não houver exceção
             with conn.cursor() as cur:
                 if verbose:
-                    print("[INSERT DATA]", data)
-                cur.execute(sql_insert, data)
-                cur.execute(sql_update, (id_registro,))
-        print(f"[OK] Resumo gravado e processo marcado: ID={id_registro}, CPF={cpf}, Processo={numero_processo}")
+                    print(f"[COPY LOTE] {len(pending)} linhas")
+                cur.copy_expert(SQL_COPY_LOTE, buf)
+                cur.execute(SQL_UPDATE_LOTE, (pending_ids,))
+        print(f"[OK] Lote gravado: {len(pending)} resumos (ids {pending_ids[0]}..{pending_ids[-1]})")
+        return True
     except Exception as e:
         # 'with conn:' já executa rollback em caso de exceção,
         # mas registramos o erro para diagnóstico
-        print(f"[ERRO] Falha ao inserir/atualizar ID={id_registro} (rollback efetuado): {e}")
-        # Propaga se quiser parar o processamento; ou comente a linha abaixo para pular e continuar
-        # raise
+        print(f"[ERRO] Falha ao gravar lote de {len(pending)} linhas (rollback efetuado): {e}")
+        return False
+    finally:
+        pending.clear()
+        pending_ids.clear()
 
 
 # ---------------------- MAIN LOOP --------------------
-def fetch_and_process(limit: Optional[int] = None, specific_id: Optional[int] = None, verbose: bool = False):
+def _drenar_chunk(executor, chunk: list, pending: list, pending_ids: list,
+                  falhas: list, use_subprocess: bool, verbose: bool):
+    """
+    Computa o bloco e despeja os resultados nas listas do lote de escrita.
+    Com executor (caminho in-process): submit + as_completed no pool de
+    processos — as linhas são independentes e a aritmética é CPU-bound, então
+    escala ~linear nos núcleos. Sem executor (--subprocess): serial.
+    Linha que falhar (índice fora do CSV, valor malformado) é logada, entra
+    em falhas e é pulada; o resto do bloco segue normalmente para o flush.
+    """
+    def _acumular(id_registro, cpf, num_proc, result):
+        pending.append((cpf, num_proc) + tuple(
+            z if result[k] is None else result[k] for k, z in _COLS_E_ZEROS
+        ))
+        pending_ids.append(id_registro)
+
+    def _pular(id_registro, e):
+        falhas.append(id_registro)
+        print(f"[ERRO] Cálculo falhou p/ ID={id_registro} (linha pulada): {e}")
+
+    if executor is not None:
+        futures = {
+            executor.submit(call_app4_inprocess, p, a, j, verbose=verbose):
+                (id_registro, cpf, num_proc)
+            for (id_registro, cpf, num_proc, p, a, j) in chunk
+        }
+        for fut in as_completed(futures):
+            id_registro, cpf, num_proc = futures[fut]
+            try:
+                _acumular(id_registro, cpf, num_proc, fut.result())
+            except Exception as e:
+                _pular(id_registro, e)
+    else:
+        calc = call_app4_and_parse if use_subprocess else call_app4_inprocess
+        for (id_registro, cpf, num_proc, p, a, j) in chunk:
+            try:
+                _acumular(id_registro, cpf, num_proc,
+                          calc(principal=p, ano_venc=a, juros_mora_ant=j, verbose=verbose))
+            except Exception as e:
+                _pular(id_registro, e)
+    chunk.clear()
+
+def fetch_and_process(limit: Optional[int] = None, specific_id: Optional[int] = None,
+                      verbose: bool = False, use_subprocess: bool = False):
     sql = DEFAULT_SQL.strip()
-    where = []
-    params = []
-
     if specific_id is not None:
-        where.append("id = %s")
-        params.append(int(specific_id))
-    if where:
-        sql += " WHERE " + " AND ".join(where)
-    sql += " ORDER BY id"
-    if limit is not None and specific_id is None:
-        sql += f" LIMIT {int(limit)}"
+        sql += " AND id = %s"
+    # fila de trabalho: FOR UPDATE SKIP LOCKED deixa várias instâncias do
+    # main.py reivindicarem lotes disjuntos sem coordenação — cada worker
+    # trava as linhas do seu lote até o commit e os demais pulam as travadas
+    # linhas que falharam nesta execução saem da fila — sem isso o claim as
+    # reivindicaria de novo a cada volta (process_calculo segue false)
+    sql += " AND id <> ALL(%s) ORDER BY id FOR UPDATE SKIP LOCKED LIMIT %s"
 
     conn = None
+    executor = None
     try:
         conn = psycopg2.connect(**DB_CONFIG)
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            if verbose:
-                print("Executando SQL:\n", sql)
-            cur.execute(sql, tuple(params))
-            rows = cur.fetchall()
 
-        if not rows:
+        # pool só no caminho in-process; a conexão fica na thread principal
+        if not use_subprocess:
+            executor = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+        pending: list = []      # tuplas na ordem de _INSERT_COLS
+        pending_ids: list = []  # ids a marcar como process_calculo = true
+        chunk: list = []        # (id, cpf, num_proc, principal, ano, juros) por linha
+        falhas: list = []       # ids com erro de cálculo nesta execução
+        total = 0
+
+        if verbose:
+            print("Executando SQL:\n", sql)
+
+        while True:
+            lote = BATCH_SIZE if limit is None else min(BATCH_SIZE, limit - total)
+            if lote <= 0:
+                break
+            params = ((int(specific_id), falhas, lote) if specific_id is not None
+                      else (falhas, lote))
+
+            # transação curta por lote: o SELECT reivindica (trava) as linhas
+            # e o COPY + UPDATE do flush saem no mesmo commit, soltando os
+            # locks — por isso leitura e escrita dividem a mesma conexão
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall()
+
+            if not rows:
+                conn.rollback()
+                break
+
+            # cursor de tuplas + desempacotamento posicional (ordem do SELECT
+            # em DEFAULT_SQL): sem o dict por linha do RealDictCursor
+            for (id_registro, numero_ordem, cpf, num_proc,
+                 valor_precatorio, principal, ano_base, juros_mora) in rows:
+                total += 1
+
+                if ano_base is not None:
+                    ano_base = _to_int_year(ano_base)
+
+                print(f"\n=== Row {total} ===")
+                print(f"CPF: {cpf} | Processo: {num_proc}")
+                print(f"id: {id_registro}")
+                print(f"numero_ordem: {numero_ordem}")
+                print(f"valor_precatorio: {valor_precatorio}")
+                print(f"principal: {principal}")
+                print(f"ano_base: {ano_base}")
+                print(f"juros_mora: {juros_mora}")
+
+                principal_str = _to_number_str_money(principal)
+                ano_venc_int = _to_int_year(ano_base)
+                juros_ant_str = _to_number_str_money(juros_mora)
+
+                chunk.append((id_registro, cpf, num_proc,
+                              principal_str, ano_venc_int, juros_ant_str))
+
+            _drenar_chunk(executor, chunk, pending, pending_ids, falhas,
+                          use_subprocess, verbose)
+            if not flush_results(conn, pending, pending_ids, verbose=verbose):
+                # rollback devolveu o lote à fila; insistir repetiria o erro
+                break
+            if specific_id is not None:
+                break
+
+        if total == 0:
             print("Nenhuma linha retornada.")
-            return
-
-        for i, row in enumerate(rows, start=1):
-            ano_base = row.get("ano_base")
-            if ano_base is not None:
-                row["ano_base"] = _to_int_year(ano_base)
-
-            cpf = row.get("cpf")
-            num_proc = row.get("numero_processo_cnj")
-
-            print(f"\n=== Row {i} ===")
-            print(f"CPF: {cpf} | Processo: {num_proc}")
-            for k, v in row.items():
-                if k not in ("cpf", "numero_processo_cnj"):
-                    print(f"{k}: {v}")
-
-            principal_str = _to_number_str_money(row.get("principal"))
-            ano_venc_int = _to_int_year(row.get("ano_base"))
-            juros_ant_str = _to_number_str_money(row.get("juros_mora"))
-
-            result = call_app4_and_parse(
-                principal=principal_str,
-                ano_venc=ano_venc_int,
-                juros_mora_ant=juros_ant_str,
-                indices_csv="indices_ipcae.csv",
-                verbose=verbose,
-            )
-
-            insert_calc_result(conn, row["id"], cpf, num_proc, result, verbose=verbose)
 
     except Exception as e:
         print(f"[ERRO] {e}")
     finally:
+        if executor:
+            executor.shutdown()
         if conn:
             conn.close()
 
@@ -396,6 +459,8 @@ def main():
     parser.add_argument("--limit", type=int, default=None)
     parser.add_argument("--id", type=int, default=None)
     parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--subprocess", action="store_true",
+                        help="Usa o caminho antigo (fork do app_4.py + parse da saída), p/ conferência.")
     args = parser.parse_args()
 
     missing = [k for k, v in DB_CONFIG.items() if not v]
@@ -403,7 +468,8 @@ def main():
         print("ERRO: faltam variáveis no .env:", missing)
         return
 
-    fetch_and_process(limit=args.limit, specific_id=args.id, verbose=args.verbose)
+    fetch_and_process(limit=args.limit, specific_id=args.id, verbose=args.verbose,
+                      use_subprocess=args.subprocess)
 
 if __name__ == "__main__":
     main()